@@ -0,0 +1,69 @@
+# tests/test_analysis.py
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from trading_project import analysis
+
+
+def closes(values) -> pd.DataFrame:
+    values = np.asarray(values, dtype=np.float64)
+    return pd.DataFrame({"Close": values}, index=pd.bdate_range("2020-01-01", periods=len(values)))
+
+
+@unittest.skipIf(analysis.talib is None, "TA-Lib is not installed")
+class CalculateRsiTest(unittest.TestCase):
+    """The TA-Lib path must give what the kernel gives when TA-Lib is missing."""
+
+    def assert_same_rsi(self, data: pd.DataFrame, window: int = 14):
+        with_talib = analysis.calculate_rsi(data, window)
+        with mock.patch.object(analysis, "talib", None):
+            without_talib = analysis.calculate_rsi(data, window)
+        self.assertEqual(with_talib.dtype, without_talib.dtype)
+        np.testing.assert_array_equal(np.isnan(with_talib), np.isnan(without_talib))
+        np.testing.assert_allclose(with_talib, without_talib, atol=1e-3, equal_nan=True)
+
+    def test_random_walk(self):
+        rng = np.random.default_rng(0)
+        self.assert_same_rsi(closes(100 + np.cumsum(rng.normal(0, 1, 2000))))
+
+    def test_flat_prefix_longer_than_window(self):
+        rng = np.random.default_rng(1)
+        self.assert_same_rsi(closes(np.r_[np.full(40, 100.0), 100 + np.cumsum(rng.normal(0, 1, 200))]))
+
+    def test_flat_series(self):
+        self.assert_same_rsi(closes(np.full(50, 100.0)))
+
+    def test_falling_then_flat(self):
+        self.assert_same_rsi(closes(np.r_[np.linspace(120, 100, 30), np.full(30, 100.0)]))
+
+
+class ParallelMovingAverageTest(unittest.TestCase):
+    """The blocked parallel kernel must match the sequential one, also across block seams."""
+
+    def assert_same_average(self, values: np.ndarray, window: int):
+        out = np.empty_like(values)
+        analysis._moving_average_parallel(values, window, out)
+        expected = analysis._moving_average_kernel(values, window)
+        np.testing.assert_array_equal(np.isnan(out), np.isnan(expected))
+        np.testing.assert_allclose(out, expected, rtol=1e-5, equal_nan=True)
+
+    def test_nans_on_block_boundaries(self):
+        block = analysis._PARALLEL_BLOCK_SIZE
+        n = analysis._PARALLEL_MIN_SIZE + block // 2  # Several blocks, the last one partial
+        rng = np.random.default_rng(2)
+        values = 100 + np.cumsum(rng.normal(0, 1, n))
+        first_seam, second_seam = block, 2 * block  # The seam at 3 * block is left NaN-free
+        values[first_seam - 1] = np.nan  # Last value of a block
+        values[first_seam] = np.nan  # First value of the next one
+        values[second_seam - 1] = np.nan  # Only in the window seeding the next block
+        for dtype in (np.float64, np.float32):
+            for window in (1, 20, block + 3):
+                with self.subTest(dtype=dtype.__name__, window=window):
+                    self.assert_same_average(values.astype(dtype), window)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+# tests/test_data_api.py
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from trading_project import data_api
+
+
+class StubTicker:
+    """
+    Stands in for yf.Ticker: daily session bars up to today, served the way Yahoo does,
+    i.e. "1d"/"5d" count sessions and longer periods run from the same time one period ago.
+    """
+
+    def __init__(self, sessions: int = 600):
+        index = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=sessions, name="Date")
+        index.freq = None  # yfinance indexes carry no frequency
+        close = 100 + np.arange(sessions, dtype=np.float64)
+        self.bars = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1000,
+                                  "Dividends": 0.0, "Stock Splits": 0.0}, index=index)
+        self.calls = []
+
+    def add_bar(self, stock_split: float = 0.0):
+        """Appends the next session; a split back-adjusts every earlier bar, as auto_adjust does."""
+        if stock_split:
+            self.bars[["Open", "High", "Low", "Close"]] /= stock_split
+        bar = self.bars.iloc[[-1]].copy()
+        bar.index = bar.index + pd.offsets.BDay(1)
+        bar["Stock Splits"] = stock_split
+        self.bars = pd.concat([self.bars, bar])
+        return bar
+
+    def history(self, period=None, start=None, end=None):
+        self.calls.append({"period": period, "start": start, "end": end})
+        if start is not None:
+            data = self.bars[self.bars.index >= pd.Timestamp(start, tz=self.bars.index.tz)]
+            if end is not None:
+                data = data[data.index < pd.Timestamp(end, tz=self.bars.index.tz)]
+            return data.copy()
+        if period == "max":
+            return self.bars.copy()
+        if period.endswith("d"):
+            return self.bars.iloc[-int(period[:-1]):].copy()
+        return self.bars[self.bars.index >= pd.Timestamp.now(tz="UTC") - data_api._PERIOD_OFFSETS[period]].copy()
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(data_api, "CACHE_DIR", self.cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.cache_dir.cleanup)
+        self.ticker = StubTicker()
+
+    def fetch(self, period):
+        return data_api._fetch_with_disk_cache(self.ticker, "TEST", period)
+
+    def expire_cache(self):
+        meta_path = data_api._cache_path("TEST") + ".json"
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta["fetched_at"] -= data_api.CACHE_REFRESH_SECONDS + 1
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+    def test_cold_fetch_returns_what_yfinance_returns(self):
+        for period in ("1mo", "1y"):
+            with self.subTest(period=period):
+                pd.testing.assert_frame_equal(self.fetch(period), self.ticker.history(period=period))
+
+    def test_warm_fetch_matches_cold_fetch_without_downloading(self):
+        cold = self.fetch("1mo")
+        self.ticker.calls.clear()
+        pd.testing.assert_frame_equal(self.fetch("1mo"), cold)
+        self.assertEqual(self.ticker.calls, [])
+
+    def test_longer_period_extends_cache_and_keeps_shorter_period_rows(self):
+        month = self.fetch("1mo")
+        year = self.fetch("1y")
+        pd.testing.assert_frame_equal(year, self.ticker.history(period="1y"))
+        self.ticker.calls.clear()
+        pd.testing.assert_frame_equal(self.fetch("1mo"), month)
+        self.assertEqual(self.ticker.calls, [])
+
+    def test_shorter_period_is_served_from_longer_cache(self):
+        self.fetch("1y")
+        self.ticker.calls.clear()
+        month = self.fetch("3mo")
+        self.assertEqual(self.ticker.calls, [])
+        self.assertFalse(month.empty)
+        self.assertGreaterEqual(month.index[0], data_api._period_start("3mo"))
+
+    def test_stale_cache_downloads_only_latest_bars(self):
+        self.fetch("1y")
+        new_bar = self.ticker.add_bar()
+        self.expire_cache()
+        self.ticker.calls.clear()
+
+        data = self.fetch("1y")
+        self.assertEqual(len(self.ticker.calls), 1)
+        self.assertIsNotNone(self.ticker.calls[0]["start"])
+        self.assertEqual(data.index[-1], new_bar.index[0])
+        self.assertEqual(len(data), len(self.ticker.history(period="1y")) - 1)  # Window moves forward by the new bar
+
+    def test_split_rebuilds_back_adjusted_cache(self):
+        self.fetch("1y")
+        self.ticker.add_bar(stock_split=4.0)
+        self.expire_cache()
+
+        pd.testing.assert_frame_equal(self.fetch("1y"), self.ticker.history(period="1y"))
+        self.ticker.calls.clear()
+        pd.testing.assert_frame_equal(self.fetch("1y"), self.ticker.history(period="1y"))  # Served from the rebuilt cache
+        self.assertEqual(len(self.ticker.calls), 1)
+
+    def test_changed_close_on_cached_bar_rebuilds_cache(self):
+        self.fetch("1y")
+        self.ticker.bars["Close"] *= 0.99  # e.g. a dividend adjustment reported on an older bar
+        self.ticker.add_bar()
+        self.expire_cache()
+        pd.testing.assert_frame_equal(self.fetch("1y"), self.ticker.history(period="1y"))
+
+    def test_corrupt_cache_is_treated_as_cold(self):
+        self.fetch("1y")
+        meta_path = data_api._cache_path("TEST") + ".json"
+        with open(meta_path) as f:
+            torn = f.read()[:10]
+        with open(meta_path, "w") as f:
+            f.write(torn)
+
+        pd.testing.assert_frame_equal(self.fetch("1y"), self.ticker.history(period="1y"))
+        with open(meta_path) as f:
+            self.assertIn("rows", json.load(f))  # Rewritten on the cold fetch
+
+    def test_unusable_cache_dir_downloads_directly(self):
+        blocker = os.path.join(self.cache_dir.name, "not_a_dir")
+        open(blocker, "w").close()
+        with mock.patch.object(data_api, "CACHE_DIR", os.path.join(blocker, "cache")):
+            pd.testing.assert_frame_equal(self.fetch("1y"), self.ticker.history(period="1y"))
+
+    def test_download_errors_propagate(self):
+        with mock.patch.object(self.ticker, "history", side_effect=ConnectionError("network down")):
+            with self.assertRaises(ConnectionError):
+                self.fetch("1y")
+
+    def test_max_after_partial_cache_downloads_full_history(self):
+        self.fetch("1mo")
+        pd.testing.assert_frame_equal(self.fetch("max"), self.ticker.bars)
+
+
+class DownloadHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        data_api._download_history.clear()
+        self.addCleanup(data_api._download_history.clear)
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        self.ticker = StubTicker()
+
+    def test_cache_dir_does_not_depend_on_working_directory(self):
+        package_dir = os.path.dirname(os.path.abspath(data_api.__file__))
+        self.assertEqual(data_api.CACHE_DIR, os.path.join(package_dir, "cache"))
+
+    def test_session_periods_bypass_disk_cache(self):
+        with mock.patch.object(data_api, "CACHE_DIR", self.cache_dir.name), \
+                mock.patch.object(data_api.yf, "Ticker", return_value=self.ticker):
+            for period, rows in (("1d", 1), ("5d", 5)):
+                with self.subTest(period=period):
+                    self.assertEqual(len(data_api._download_history("TEST", period)), rows)
+        self.assertEqual(os.listdir(self.cache_dir.name), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
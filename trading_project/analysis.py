@@ -1,32 +1,266 @@
 # trading_project/analysis.py
+import math
+
+import numpy as np
 import pandas as pd
 
+from trading_project.utils import njit, prange
+
+try:
+    import numba
+except ImportError:  # numba is optional; the kernels below then run as plain Python
+    numba = None
+
+try:
+    import bottleneck as bn
+except ImportError:  # bottleneck is optional; fall back to the numba kernel
+    bn = None
+
+try:
+    import talib
+except ImportError:  # TA-Lib is optional; its C kernels are used when installed
+    talib = None
+
+@njit(cache=True)
+def _moving_average_kernel(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean via a running sum; windows containing NaN give NaN, like pandas."""
+    n = values.shape[0]
+    out = np.empty(n, dtype=values.dtype)  # float64 accumulator, output in the input's dtype
+    total = 0.0
+    nan_count = 0
+
+    for i in range(n):
+        if np.isnan(values[i]):
+            nan_count += 1
+        else:
+            total += float(values[i])
+        if i >= window:
+            if np.isnan(values[i - window]):
+                nan_count -= 1
+            else:
+                total -= float(values[i - window])
+
+        if i >= window - 1 and nan_count == 0:
+            out[i] = total / window
+        else:
+            out[i] = np.nan
+    return out
+
+# Inputs above this size use the multi-threaded kernel; below it, threading overhead dominates
+_PARALLEL_MIN_SIZE = 100_000
+_PARALLEL_BLOCK_SIZE = 32_768
+
+@njit(parallel=True, cache=True)
+def _moving_average_parallel(values: np.ndarray, window: int, out: np.ndarray) -> None:
+    """
+    Same result as _moving_average_kernel, computed block by block across threads.
+    Each block seeds its running sum with the window-1 values before it.
+    """
+    n = values.shape[0]
+    n_blocks = (n + _PARALLEL_BLOCK_SIZE - 1) // _PARALLEL_BLOCK_SIZE
+    for block in prange(n_blocks):
+        start = block * _PARALLEL_BLOCK_SIZE
+        stop = min(start + _PARALLEL_BLOCK_SIZE, n)
+        first = max(0, start - window + 1)  # First value of the window ending at 'start'
+        total = 0.0
+        nan_count = 0
+        for i in range(first, start):
+            if np.isnan(values[i]):
+                nan_count += 1
+            else:
+                total += float(values[i])
+
+        for i in range(start, stop):
+            if np.isnan(values[i]):
+                nan_count += 1
+            else:
+                total += float(values[i])
+            if i - window >= first:
+                if np.isnan(values[i - window]):
+                    nan_count -= 1
+                else:
+                    total -= float(values[i - window])
+
+            if i >= window - 1 and nan_count == 0:
+                out[i] = total / window
+            else:
+                out[i] = np.nan
+
+def moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average of a float array; the first window-1 entries are NaN.
+    float32 input gives float32 output, anything else is computed as float64.
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        values = values.astype(np.float64, copy=False)
+    if window > values.shape[0]:
+        return np.full(values.shape[0], np.nan, dtype=values.dtype)
+    if numba is not None and values.shape[0] > _PARALLEL_MIN_SIZE:
+        out = np.empty_like(values)
+        _moving_average_parallel(values, window, out)
+        return out
+    # TA-Lib lets a single NaN poison every later value, so only use it on NaN-free input
+    if talib is not None and window >= 2 and not np.isnan(values).any():
+        # TA-Lib only takes float64
+        return talib.SMA(values.astype(np.float64), timeperiod=window).astype(values.dtype, copy=False)
+    if bn is not None:
+        # bottleneck sums in the input's dtype, so give it float64 too
+        return bn.move_mean(values.astype(np.float64, copy=False), window=window, min_count=window).astype(values.dtype, copy=False)
+    return _moving_average_kernel(values, window)
+
 def calculate_sma(data: pd.DataFrame, window: int = 20) -> pd.Series:
-    """Calculates the Simple Moving Average (SMA)."""
+    """Calculates the Simple Moving Average (SMA) as float32."""
     if 'Close' not in data.columns:
         return pd.Series(dtype=float)
-    return data['Close'].rolling(window=window).mean()
+    # float32 is plenty for prices and halves the bytes each pass has to read
+    return pd.Series(moving_average(data['Close'].to_numpy(dtype=np.float32), window), index=data.index)
+
+@njit(cache=True)
+def wilder_step(i: int, delta: float, avg_gain: float, avg_loss: float, window: int):
+    """
+    One step of Wilder's smoothing, as in TA-Lib and TradingView, for the price change
+    'delta' at position i >= 1. Until i == window the gains/losses are summed and then
+    averaged; after that avg = (avg * (window - 1) + value) / window.
+    A NaN delta counts as no change. Returns the new (avg_gain, avg_loss).
+    """
+    gain = 0.0
+    loss = 0.0
+    if delta > 0:
+        gain = delta
+    elif delta < 0:
+        loss = -delta
+
+    if i < window:
+        return avg_gain + gain, avg_loss + loss
+    if i == window:
+        return (avg_gain + gain) / window, (avg_loss + loss) / window
+    return (avg_gain * (window - 1) + gain) / window, (avg_loss * (window - 1) + loss) / window
+
+@njit(cache=True)
+def _rsi_kernel(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    One-pass RSI using Wilder's smoothing (see wilder_step).
+    Averages are accumulated in float64; the output has the input's dtype.
+    """
+    n = close.shape[0]
+    out = np.empty(n, dtype=close.dtype)
+    avg_gain = 0.0
+    avg_loss = 0.0
+
+    for i in range(1, n):
+        avg_gain, avg_loss = wilder_step(i, float(close[i]) - float(close[i - 1]), avg_gain, avg_loss, window)
+        if i < window:
+            continue
+
+        # RSI is 100 when there are no losses to divide by
+        if avg_loss == 0.0:
+            out[i] = 100.0
+        else:
+            out[i] = 100.0 * avg_gain / (avg_gain + avg_loss)
+
+    # RSI is undefined for the first 'window' periods, so set to NaN
+    out[:window] = np.nan
+    return out
 
 def calculate_rsi(data: pd.DataFrame, window: int = 14) -> pd.Series:
-    """Calculates the Relative Strength Index (RSI)."""
+    """Calculates the Relative Strength Index (RSI) as float32."""
     if 'Close' not in data.columns:
         return pd.Series(dtype=float)
 
-    delta = data['Close'].diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
+    close = data['Close'].to_numpy(dtype=np.float32)
+    if talib is not None and window >= 2 and not np.isnan(close).any():
+        # TA-Lib only takes float64
+        rsi = talib.RSI(close.astype(np.float64), timeperiod=window).astype(np.float32)
+        # TA-Lib reports 0 until the price first moves; the kernel reports 100 there
+        moved = np.flatnonzero(np.diff(close))
+        rsi[window:moved[0] + 1 if moved.size else len(close)] = 100.0
+    else:
+        rsi = _rsi_kernel(close, window)
+    return pd.Series(rsi, index=data.index)
 
-    avg_gain = gain.ewm(com=window-1, adjust=False).mean() # Using EWMA for smoother average
-    avg_loss = loss.ewm(com=window-1, adjust=False).mean()
+@njit(cache=True)
+def _wilder_averages(close: np.ndarray, window: int):
+    """Final (avg_gain, avg_loss) of _rsi_kernel's recurrence, without the RSI array."""
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, close.shape[0]):
+        avg_gain, avg_loss = wilder_step(i, float(close[i]) - float(close[i - 1]), avg_gain, avg_loss, window)
+    return avg_gain, avg_loss
 
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+class StreamingIndicators:
+    """
+    Incremental SMA and RSI for live prices: each new close is folded in with O(1) work
+    (a ring-buffer running sum for the SMA, Wilder's recurrence for the RSI) instead of
+    recomputing the whole history. Matches calculate_sma/calculate_rsi for NaN-free closes,
+    up to their float32 output precision.
+    """
 
-    # Handle division by zero where avg_loss is 0 (RSI should be 100)
-    rsi = rsi.fillna(100)
-    # RSI is undefined for the first 'window' periods, so set to NaN
-    rsi.iloc[:window] = pd.NA
+    def __init__(self, sma_window: int = 20, rsi_window: int = 14):
+        self.sma_window = sma_window
+        self.rsi_window = rsi_window
+        self.count = 0  # Number of closes pushed so far
+        self.sma_ring = [0.0] * sma_window  # The last 'sma_window' closes
+        self.sma_sum = 0.0
+        self.rsi_avg_gain = 0.0
+        self.rsi_avg_loss = 0.0
+        self.prev_close = None
+        self.sma = math.nan
+        self.rsi = math.nan
+
+    @classmethod
+    def from_closes(cls, closes: np.ndarray, sma_window: int = 20, rsi_window: int = 14) -> "StreamingIndicators":
+        """
+        State after pushing every close in 'closes', computed in one compiled pass
+        instead of calling update() per bar.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        stream = cls(sma_window, rsi_window)
+        n = closes.shape[0]
+        if n == 0:
+            return stream
+
+        stream.count = n
+        for i in range(max(0, n - sma_window), n):
+            stream.sma_ring[i % sma_window] = float(closes[i])
+        stream.sma_sum = float(closes[-sma_window:].sum())
+        stream.rsi_avg_gain, stream.rsi_avg_loss = _wilder_averages(closes, rsi_window)
+        stream.prev_close = float(closes[-1])
+        if n >= sma_window:
+            stream.sma = stream.sma_sum / sma_window
+        if n > rsi_window:
+            avg_gain, avg_loss = stream.rsi_avg_gain, stream.rsi_avg_loss
+            stream.rsi = 100.0 if avg_loss == 0.0 else 100.0 * avg_gain / (avg_gain + avg_loss)
+        return stream
+
+    def _step(self, price: float):
+        """Indicator state after appending 'price', without modifying self."""
+        i = self.count  # Position of the new close in the series
+        sma_sum = self.sma_sum + price
+        if i >= self.sma_window:
+            sma_sum -= self.sma_ring[i % self.sma_window]
+        sma = sma_sum / self.sma_window if i >= self.sma_window - 1 else math.nan
+
+        avg_gain, avg_loss, rsi = self.rsi_avg_gain, self.rsi_avg_loss, math.nan
+        if i > 0:
+            avg_gain, avg_loss = wilder_step(i, price - self.prev_close, avg_gain, avg_loss, self.rsi_window)
+            if i >= self.rsi_window:
+                rsi = 100.0 if avg_loss == 0.0 else 100.0 * avg_gain / (avg_gain + avg_loss)
+
+        return sma_sum, sma, avg_gain, avg_loss, rsi
+
+    def update(self, price: float):
+        """Appends a closed bar and returns the new (sma, rsi)."""
+        price = float(price)
+        self.sma_sum, self.sma, self.rsi_avg_gain, self.rsi_avg_loss, self.rsi = self._step(price)
+        self.sma_ring[self.count % self.sma_window] = price
+        self.prev_close = price
+        self.count += 1
+        return self.sma, self.rsi
 
-    return rsi
+    def peek(self, price: float):
+        """(sma, rsi) if 'price' were the next close, e.g. for a bar that is still forming."""
+        _, sma, _, _, rsi = self._step(float(price))
+        return sma, rsi
 
 # Add other indicator functions here (e.g., MACD, Bollinger Bands)
@@ -1,14 +1,58 @@
 # app.py
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
 
 # --- Import functions from your modules ---
 from trading_project.data_api import fetch_historical_data, fetch_realtime_price
-from trading_project.analysis import calculate_sma, calculate_rsi
-from trading_project.strategies import generate_signals
+from trading_project.analysis import StreamingIndicators
+from trading_project.strategies import compute_all
 from trading_project.utils import format_date_for_display
 
+def get_streaming_indicators(symbol: str, period: str, closes: pd.Series, sma_window: int, rsi_window: int) -> StreamingIndicators:
+    """
+    Per-symbol StreamingIndicators kept in st.session_state, so each rerun only pushes
+    the bars closed since the previous one. If the stored last bar is gone or its Close
+    changed (e.g. yfinance back-adjusted the history), or the settings changed, the state
+    is rebuilt from the closed bars. The last bar is left out as it may still be forming.
+    """
+    key = f"streaming_indicators_{symbol}"
+    state = st.session_state.get(key)
+    params = (period, sma_window, rsi_window)
+    closed = closes.iloc[:-1]
+
+    if (state is not None and state["params"] == params and state["last_bar"] in closed.index
+            and closed.loc[state["last_bar"]] == state["last_close"]):
+        stream = state["stream"]
+        for price in closed[closed.index > state["last_bar"]].to_numpy():
+            stream.update(price)
+    else:
+        stream = StreamingIndicators.from_closes(closed.to_numpy(), sma_window, rsi_window)
+
+    st.session_state[key] = {
+        "stream": stream,
+        "params": params,
+        "last_bar": closed.index[-1] if not closed.empty else None,
+        "last_close": closed.iloc[-1] if not closed.empty else None,
+    }
+    return stream
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def compute_indicators(close: np.ndarray, sma_window: int, rsi_window: int, rsi_oversold: int, rsi_overbought: int):
+    """
+    SMA, RSI and Signal arrays for the Close prices. Cached on the array contents and
+    parameters, so reruns triggered by unrelated widgets skip the indicator pass. The
+    fetch stays outside, so a failed download is never replayed from this cache.
+    """
+    return compute_all(
+        close,
+        sma_window=sma_window,
+        rsi_window=rsi_window,
+        rsi_oversold=rsi_oversold,
+        rsi_overbought=rsi_overbought
+    )
+
 # --- Streamlit App Configuration ---
 st.set_page_config(page_title="Trading Bot Dashboard", layout="wide")
 st.title("Trading Bot Dashboard")
@@ -36,35 +80,29 @@ with st.sidebar:
 if run_analysis and symbol:
     st.header(f"Analysis for {symbol}")
 
-    # Fetch Data
-    data = fetch_historical_data(symbol, period=data_period)
+    # Fetch Data (downloads are cached in data_api)
+    data_with_signals = fetch_historical_data(symbol, period=data_period)
 
-    if not data.empty:
+    if not data_with_signals.empty:
         # Ensure index is datetime for plotting
-        data.index = pd.to_datetime(data.index)
-
-        # Calculate Indicators
-        data['SMA'] = calculate_sma(data, window=sma_window)
-        data['RSI'] = calculate_rsi(data, window=rsi_window)
-
-        # Generate Signals
-        data_with_signals = generate_signals(
-            data.copy(), # Pass a copy to avoid modifying original data if used elsewhere
-            sma_window=sma_window,
-            rsi_window=rsi_window,
-            rsi_oversold=rsi_oversold,
-            rsi_overbought=rsi_overbought
+        data_with_signals.index = pd.to_datetime(data_with_signals.index)
+        # Calculate Indicators and Generate Signals in a single pass over the Close prices
+        data_with_signals['SMA'], data_with_signals['RSI'], data_with_signals['Signal'] = compute_indicators(
+            data_with_signals['Close'].to_numpy(), sma_window, rsi_window, rsi_oversold, rsi_overbought
         )
 
         # --- Display Key Metrics ---
+        # Live values: the latest price is evaluated on top of the streaming state in O(1)
         col1, col2, col3 = st.columns(3)
-        latest_close = data_with_signals['Close'].iloc[-1] if not data_with_signals.empty else "N/A"
-        latest_sma = data_with_signals['SMA'].iloc[-1] if not data_with_signals.empty else "N/A"
-        latest_rsi = data_with_signals['RSI'].iloc[-1] if not data_with_signals.empty else "N/A"
+        latest_price = fetch_realtime_price(symbol)
+        if latest_price is None:
+            latest_price = data_with_signals['Close'].iloc[-1]
+        stream = get_streaming_indicators(symbol, data_period, data_with_signals['Close'], sma_window, rsi_window)
+        latest_sma, latest_rsi = stream.peek(latest_price)
 
-        col1.metric("Latest Close", f"${latest_close:.2f}" if isinstance(latest_close, (int, float)) else latest_close)
-        col2.metric(f"SMA({sma_window})", f"${latest_sma:.2f}" if isinstance(latest_sma, (int, float)) else latest_sma)
-        col3.metric(f"RSI({rsi_window})", f"{latest_rsi:.2f}" if isinstance(latest_rsi, (int, float)) else latest_rsi)
+        col1.metric("Latest Price", f"${latest_price:.2f}")
+        col2.metric(f"SMA({sma_window})", f"${latest_sma:.2f}")
+        col3.metric(f"RSI({rsi_window})", f"{latest_rsi:.2f}")
 
         # --- Plotting ---
         st.subheader("Price Action and Indicators")
@@ -73,12 +111,15 @@ if run_analysis and symbol:
         fig_price = px.line(data_with_signals, x=data_with_signals.index, y='Close', title=f'{symbol} Price & SMA')
         fig_price.add_scatter(x=data_with_signals.index, y=data_with_signals['SMA'], mode='lines', name=f'SMA({sma_window})')
 
-        # Add buy/sell markers
-        buy_signals = data_with_signals[data_with_signals['Signal'] == 1]
-        sell_signals = data_with_signals[data_with_signals['Signal'] == -1]
+        # Add buy/sell markers (positions into plain arrays, no filtered DataFrame copies)
+        signal = data_with_signals['Signal'].to_numpy()
+        buy_idx = np.flatnonzero(signal == 1)
+        sell_idx = np.flatnonzero(signal == -1)
+        index_arr = data_with_signals.index.to_numpy()
+        close_arr = data_with_signals['Close'].to_numpy()
 
-        fig_price.add_scatter(x=buy_signals.index, y=buy_signals['Close'], mode='markers', marker_symbol='triangle-up', marker_color='green', marker_size=10, name='Buy Signal')
-        fig_price.add_scatter(x=sell_signals.index, y=sell_signals['Close'], mode='markers', marker_symbol='triangle-down', marker_color='red', marker_size=10, name='Sell Signal')
+        fig_price.add_scatter(x=index_arr[buy_idx], y=close_arr[buy_idx], mode='markers', marker_symbol='triangle-up', marker_color='green', marker_size=10, name='Buy Signal')
+        fig_price.add_scatter(x=index_arr[sell_idx], y=close_arr[sell_idx], mode='markers', marker_symbol='triangle-down', marker_color='red', marker_size=10, name='Sell Signal')
 
         st.plotly_chart(fig_price, use_container_width=True)
 
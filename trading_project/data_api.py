@@ -1,11 +1,212 @@
 # trading_project/data_api.py
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 import yfinance as yf # Example dependency
 
+try:
+    import pyarrow # Needed by pandas to read/write the Parquet price cache
+except ImportError:
+    pyarrow = None
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; cache writers are then not serialized
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# --- On-disk price cache ---
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")  # Independent of the working directory
+CACHE_REFRESH_SECONDS = 3600  # Re-fetch the latest bars once the cache is older than this
+
+# Periods served from the disk cache. Yahoo counts "1d"/"5d" in trading sessions, not
+# calendar days, and they are cheap to download, so those always go straight to yfinance.
+_PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+def _cache_path(symbol: str) -> str:
+    """Parquet file holding every bar downloaded so far for a symbol."""
+    safe_symbol = re.sub(r"[^A-Za-z0-9._^=-]", "_", symbol)
+    return os.path.join(CACHE_DIR, f"{safe_symbol}.parquet")
+
+@contextmanager
+def _cache_lock(symbol: str):
+    """
+    Serializes cache readers/writers for a symbol across processes (POSIX only).
+    Yields False when the cache directory cannot be used, e.g. a read-only install.
+    """
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        lock_file = open(_cache_path(symbol) + ".lock", "w")
+    except OSError as e:
+        log.warning("Price cache unavailable, downloading directly: %s", e)
+        yield False
+        return
+    with lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _period_start(period: str):
+    """
+    Approximate start of the requested period in UTC, or None for the full ("max") history.
+    Only used to decide whether the cache reaches back far enough.
+    """
+    if period == "max":
+        return None
+    now = pd.Timestamp.now(tz="UTC").normalize()
+    if period == "ytd":
+        return now.replace(month=1, day=1)
+    return now - _PERIOD_OFFSETS[period]
+
+def _period_rows(data: pd.DataFrame, meta: dict, period: str) -> pd.DataFrame:
+    """
+    The bars yfinance would return for 'period': as many of the latest bars as it
+    returned when that period was last downloaded directly, since Yahoo's ranges do not
+    line up with a calendar cut from midnight. Falls back to that cut for periods that
+    were only ever served from bars cached for a longer one.
+    """
+    if period == "max":
+        return data
+    rows = meta["rows"].get(period)
+    if rows:
+        return data.iloc[-rows:]
+    return data[data.index >= _period_start(period)]
+
+def _read_cache(path: str, meta_path: str):
+    """Cached bars and their metadata, or (None, None) if missing or unreadable, i.e. a cold cache."""
+    if not (os.path.exists(path) and os.path.exists(meta_path)):
+        return None, None
+    try:
+        data = pd.read_parquet(path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError, pyarrow.ArrowException) as e:
+        log.warning("Ignoring unreadable price cache %s: %s", path, e)
+        return None, None
+    if data.empty or not isinstance(meta, dict) or not {"start", "rows", "fetched_at"} <= meta.keys():
+        return None, None
+    return data, meta
+
+def _write_cache(data: pd.DataFrame, meta: dict, path: str, meta_path: str) -> None:
+    """Swaps in the bars and metadata file by file, so readers never see a partial write."""
+    try:
+        data.to_parquet(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+    except (OSError, ValueError, pyarrow.ArrowException) as e:
+        log.warning("Could not write price cache %s: %s", path, e)
+
+def _download_period(ticker, period: str, start):
+    """Bars for 'period' as yfinance serves them, with fresh cache metadata."""
+    data = ticker.history(period=period)
+    return data, {"start": None if start is None else start.isoformat(), "rows": {period: len(data)}}
+
+def _matches_cache(data: pd.DataFrame, part: pd.DataFrame) -> bool:
+    """
+    False if 'part' shows that yfinance has back-adjusted bars we already cached: a split
+    or dividend among the bars after the last complete cached one, or a different Close
+    on a complete cached bar. With auto_adjust either rewrites every earlier close.
+    """
+    if part.empty:
+        return True
+    recent = part[part.index > data.index[-2]] if len(data) > 1 else part
+    for column in ("Dividends", "Stock Splits"):
+        if column in recent.columns and (recent[column].fillna(0) != 0).any():
+            return False
+    # The last cached bar may have been incomplete, so only earlier bars are compared
+    common = data.index[:-1].intersection(part.index)
+    return np.allclose(data.loc[common, "Close"], part.loc[common, "Close"], rtol=1e-6, equal_nan=True)
+
+def _fetch_with_disk_cache(ticker, symbol: str, period: str) -> pd.DataFrame:
+    """
+    Serves history from the per-symbol Parquet cache, downloading only what it lacks:
+    the period itself when it reaches further back than the cache, and the latest bars
+    once the cache is older than CACHE_REFRESH_SECONDS. If those downloads show that
+    yfinance has re-adjusted the history (split, dividend), the cache is rebuilt.
+    """
+    start = _period_start(period)
+    path = _cache_path(symbol)
+    meta_path = path + ".json"
+
+    with _cache_lock(symbol) as usable:
+        if not usable:
+            return ticker.history(period=period)
+        data, meta = _read_cache(path, meta_path)
+
+        if data is None:
+            data, meta = _download_period(ticker, period, start)
+        else:
+            cached_start = meta["start"]
+            parts = []
+            if cached_start is not None and (start is None or start < pd.Timestamp(cached_start)):
+                # The period reaches further back than the cache: download it as yfinance serves it
+                part = ticker.history(period=period)
+                parts.append(part)
+                meta["rows"][period] = len(part)
+                meta["start"] = None if start is None else start.isoformat()
+            if time.time() - meta["fetched_at"] > CACHE_REFRESH_SECONDS:
+                # Overlaps the last complete cached bar, to check it against yfinance's current values
+                since = data.index[-2] if len(data) > 1 else data.index[-1]
+                parts.append(ticker.history(start=since.strftime('%Y-%m-%d')))
+            if not parts:
+                return _period_rows(data, meta, period)
+            if all(_matches_cache(data, part) for part in parts):
+                data = pd.concat([data] + [part for part in parts if not part.empty])
+                data = data[~data.index.duplicated(keep='last')].sort_index()
+            else:
+                log.info("Price history for %s was re-adjusted; rebuilding its cache.", symbol)
+                data, meta = _download_period(ticker, period, start)
+
+        if data.empty:
+            return data
+        meta["fetched_at"] = time.time()
+        _write_cache(data, meta, path, meta_path)
+
+    return _period_rows(data, meta, period)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _download_history(symbol: str, period: str) -> pd.DataFrame:
+    """Cached yfinance download. Errors propagate so that failures are not cached."""
+    ticker = yf.Ticker(symbol)
+    if pyarrow is None or (period not in _PERIOD_OFFSETS and period not in ("ytd", "max")):
+        return ticker.history(period=period)
+    return _fetch_with_disk_cache(ticker, symbol, period)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _download_latest_close(symbol: str):
+    """Cached latest Close for a symbol, or None if yfinance returned no rows."""
+    ticker = yf.Ticker(symbol)
+    latest_data = ticker.history(period="1d") # Fetching just one day to get latest
+    if latest_data.empty:
+        return None
+    return latest_data['Close'].iloc[-1]
+
 def fetch_historical_data(symbol: str, period: str = "1y") -> pd.DataFrame:
     """
     Fetches historical stock data using yfinance.
+    Downloads are cached for an hour per (symbol, period).
 
     Args:
         symbol (str): The stock ticker symbol (e.g., "AAPL").
@@ -16,34 +217,30 @@ def fetch_historical_data(symbol: str, period: str = "1y") -> pd.DataFrame:
                       Returns an empty DataFrame if fetching fails.
     """
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period)
-        if data.empty:
-            st.warning(f"No historical data found for symbol: {symbol}")
-            return pd.DataFrame()
-        return data
+        data = _download_history(symbol, period)
     except Exception as e:
         st.error(f"Error fetching data for {symbol}: {e}")
         return pd.DataFrame()
+    if data.empty:
+        st.warning(f"No historical data found for symbol: {symbol}")
+        return pd.DataFrame()
+    return data
 
 def fetch_realtime_price(symbol: str) -> float:
     """
     Fetches the latest real-time price for a given symbol.
     Note: yfinance may not provide true real-time, but the latest available price.
     For true real-time, you'd typically need a dedicated API.
+    The price is cached for 30 seconds.
     """
     try:
-        ticker = yf.Ticker(symbol)
-        # Get the last available row and extract the Close price
-        latest_data = ticker.history(period="1d") # Fetching just one day to get latest
-        if not latest_data.empty:
-            return latest_data['Close'].iloc[-1]
-        else:
-            st.warning(f"Could not fetch latest price for {symbol}.")
-            return None
+        price = _download_latest_close(symbol)
     except Exception as e:
         st.error(f"Error fetching real-time price for {symbol}: {e}")
         return None
+    if price is None:
+        st.warning(f"Could not fetch latest price for {symbol}.")
+    return price
 
 # Add other data fetching functions here, e.g., for specific APIs if needed
 # def fetch_from_alpha_vantage(symbol: str) -> pd.DataFrame:
@@ -1,10 +1,14 @@
 # simulator.py (Modified for Streamlit app)
+import logging
+import numpy as np
 import pandas as pd
 import yaml
 import os
+from functools import reduce
 
-# Assuming your strategy.py and its functions are accessible
-from strategy import simple_strategy  # Or whatever strategies you have
+from trading_project.utils import njit
+
+log = logging.getLogger(__name__)
 
 # Define default thresholds if config file is missing
 DEFAULT_THRESHOLDS = {"simple": {"buy": 0.02, "sell": 0.03}}
@@ -19,7 +23,7 @@ def load_config_for_simulator(file_path, strategy_name, passed_thresholds):
 
     # Fallback to config file if no thresholds were passed (less likely with Streamlit's input widgets)
     if not os.path.exists(file_path):
-        print(f"Warning: Strategy config file not found at '{file_path}'. Using default thresholds.")
+        log.warning("Strategy config file not found at '%s'. Using default thresholds.", file_path)
         return DEFAULT_THRESHOLDS.get(strategy_name, {})
 
     try:
@@ -27,29 +31,133 @@ def load_config_for_simulator(file_path, strategy_name, passed_thresholds):
             config = yaml.safe_load(f)
         return config.get(strategy_name, {})
     except Exception as e:
-        print(f"Error loading strategy config for simulator: {e}")
+        log.error("Error loading strategy config for simulator: %s", e)
         return DEFAULT_THRESHOLDS.get(strategy_name, {})
 
 
-def run_simulation(data_source, strategy_name="simple", thresholds=None, initial_balance=10000):
+def _concat(*parts):
+    """Element-wise string concatenation of arrays and/or scalar strings."""
+    return reduce(np.char.add, parts)
+
+
+@njit(cache=True)
+def _simulate_core(price, window_size, buy_threshold, sell_threshold, initial_balance):
+    """
+    Compiled state walk for the 'simple' strategy. Keeps the moving average as a
+    running sum, derives the raw signal per row (1 = BUY, -1 = SELL, 0 = HOLD) and
+    enforces the position flip-flop: BUY 1 share only when flat and affordable,
+    SELL only when holding. The first window_size-1 rows are peeled off as HOLD;
+    after that, a NaN price in the window makes the moving average NaN, which
+    compares False and also stays HOLD.
+
+    Returns:
+        (moving_avg, raw, actions, balances, positions) arrays, where actions is 1/-1 only on executed trades.
+    """
+    n = price.shape[0]
+    moving_avg = np.empty(n, dtype=np.float64)
+    raw = np.zeros(n, dtype=np.int8)
+    actions = np.zeros(n, dtype=np.int8)
+    balances = np.empty(n, dtype=np.float64)
+    positions = np.empty(n, dtype=np.int64)
+
+    buy_level = 1.0 - buy_threshold
+    sell_level = 1.0 + sell_threshold
+    balance = float(initial_balance)
+    position = 0  # Number of shares held
+    window_sum = 0.0
+    nan_count = 0  # NaN prices in the current window
+
+    # Warm-up: not enough prices for a moving average yet, so nothing can trade
+    start = min(window_size - 1, n)
+    for i in range(start):
+        if np.isnan(price[i]):
+            nan_count += 1
+        else:
+            window_sum += price[i]
+        moving_avg[i] = np.nan
+        balances[i] = balance
+        positions[i] = position
+
+    # Window is full from here on; the oldest price leaves the sum at the end of each step
+    for i in range(start, n):
+        if np.isnan(price[i]):
+            nan_count += 1
+        else:
+            window_sum += price[i]
+        moving_avg[i] = window_sum / window_size if nan_count == 0 else np.nan
+
+        if price[i] < moving_avg[i] * buy_level:
+            raw[i] = 1
+            if position == 0 and balance >= price[i]:
+                balance -= price[i]
+                position += 1
+                actions[i] = 1
+        elif price[i] > moving_avg[i] * sell_level:
+            raw[i] = -1
+            if position >= 1:
+                balance += price[i]
+                position -= 1
+                actions[i] = -1
+        balances[i] = balance
+        positions[i] = position
+
+        oldest = price[i - window_size + 1]
+        if np.isnan(oldest):
+            nan_count -= 1
+        else:
+            window_sum -= oldest
+
+    return moving_avg, raw, actions, balances, positions
+
+
+# Compiled state walk per strategy name, resolved once per run instead of per row
+_STRATEGY_KERNELS = {"simple": _simulate_core}
+
+
+def _build_reasons(price, moving_avg, raw, actions, balances, positions):
+    """Human-readable log reason for every row, built column-wise."""
+    prefix = _concat("Price=", np.char.mod('%.2f', price), ", MA=", np.char.mod('%.2f', moving_avg), ". ")
+    return np.select(
+        [np.isnan(moving_avg), actions == 1, raw == 1, actions == -1, raw == -1],
+        [
+            "Insufficient data for moving average",
+            _concat(prefix, "BUY executed."),
+            _concat(prefix, "BUY recommended, but cannot execute (balance=", np.char.mod('%.2f', balances),
+                    ", position=", np.char.mod('%d', positions), ")."),
+            _concat(prefix, "SELL executed."),
+            _concat(prefix, "SELL recommended, but cannot execute (no position to sell)."),
+        ],
+        default=_concat(prefix, "Holding."),
+    )
+
+
+def run_simulation(data_source, strategy_name="simple", thresholds=None, initial_balance=10000, include_reasons=True):
     """
     Runs the simulation engine.
 
     Args:
         data_source: Path to CSV file or a file-like object (StringIO).
-        strategy_name: Name of the strategy to use (e.g., "simple").
+        strategy_name: Name of the strategy to use (a key of _STRATEGY_KERNELS, e.g. "simple").
         thresholds: A dictionary of thresholds for the selected strategy.
                     Example: {"buy": 0.02, "sell": 0.03}
         initial_balance: Starting balance for the simulation.
+        include_reasons: Whether to build the diagnostic 'reason' column. Formatting it
+                         is the most expensive part of a run, so parameter sweeps
+                         that only need balances/positions can pass False.
 
     Returns:
         A pandas DataFrame containing simulation results, or None if an error occurs.
     """
     try:
+        kernel = _STRATEGY_KERNELS.get(strategy_name)
+        if kernel is None:
+            raise ValueError(f"Strategy '{strategy_name}' not implemented. Available: {', '.join(_STRATEGY_KERNELS)}.")
+
+        # Timestamps are parsed by read_csv itself, once, while reading
         if isinstance(data_source, str):  # It's a file path
-            df_prices = pd.read_csv(data_source)
+            df_prices = pd.read_csv(data_source, parse_dates=['timestamp'])
         elif hasattr(data_source, 'read'):  # It's a file-like object (e.g., StringIO)
-            df_prices = pd.read_csv(data_source)
+            df_prices = pd.read_csv(data_source, parse_dates=['timestamp'])
         else:
             raise ValueError("Invalid data_source provided. Must be a file path or file-like object.")
 
@@ -57,10 +165,12 @@ def run_simulation(data_source, strategy_name="simple", thresholds=None, initial
         if 'timestamp' not in df_prices.columns or 'price' not in df_prices.columns:
             raise ValueError("CSV must contain 'timestamp' and 'price' columns.")
 
-        # Preprocess timestamp if it's not already datetime
-        df_prices['timestamp'] = pd.to_datetime(df_prices['timestamp'])
-        df_prices.set_index('timestamp', inplace=True)
-        df_prices.sort_index(inplace=True)  # Ensure chronological order
+        # Preprocess timestamp if read_csv could not parse it (e.g. mixed formats)
+        if not pd.api.types.is_datetime64_any_dtype(df_prices['timestamp']):
+            df_prices['timestamp'] = pd.to_datetime(df_prices['timestamp'])
+        # Ensure chronological order; exported CSVs usually already are, so skip the sort then
+        if not df_prices['timestamp'].is_monotonic_increasing:
+            df_prices = df_prices.sort_values('timestamp', kind='mergesort', ignore_index=True)
 
         # --- Strategy Configuration Loading ---
         # This part needs careful integration. The 'thresholds' parameter directly from Streamlit is preferred.
@@ -71,100 +181,54 @@ def run_simulation(data_source, strategy_name="simple", thresholds=None, initial
             # Fallback if Streamlit didn't pass any (shouldn't happen with the app.py code above)
             strategy_config_path = 'auto_trading_project/strategy_config.yaml'  # Adjust path if needed
             current_strategy_thresholds = load_config_for_simulator(strategy_config_path, strategy_name, None)
-            print(f"Warning: No explicit thresholds passed to simulator. Falling back to config/defaults.")
+            log.warning("No explicit thresholds passed to simulator. Falling back to config/defaults.")
         else:
             # Use thresholds passed directly from the Streamlit app
             current_strategy_thresholds = thresholds
-            print(f"Using thresholds passed from Streamlit: {current_strategy_thresholds}")
+            log.debug("Using thresholds passed from Streamlit: %s", current_strategy_thresholds)
 
         if not current_strategy_thresholds:  # If even fallback yields nothing
-            print(f"Error: Could not determine thresholds for strategy '{strategy_name}'.")
+            log.error("Could not determine thresholds for strategy '%s'.", strategy_name)
             return None
 
         # --- Simulation Core Logic ---
-        balance = initial_balance
-        position = 0  # Number of shares held
-        portfolio_value = initial_balance
-        simulation_logs = []
-
-        # Calculate Moving Average (example)
-        window_size = 5  # Example window size for moving average
-        df_prices['moving_avg'] = df_prices['price'].rolling(window=window_size).mean()
-
-        for index, row in df_prices.iterrows():
-            current_price = row['price']
-            moving_avg = row['moving_avg']
-
-            # Ensure moving_avg is not NaN (happens at the beginning of rolling calculation)
-            if pd.isna(moving_avg):
-                action = "HOLD"
-                reason = "Insufficient data for moving average"
-            else:
-                # Call your specific strategy function
-                # This needs to match the signature expected by the strategy function
-                if strategy_name == "simple":
-                    action = simple_strategy(
-                        current_price=current_price,
-                        moving_avg=moving_avg,
-                        thresholds=current_strategy_thresholds  # Pass the loaded/selected thresholds
-                    )
-                else:
-                    action = "HOLD"  # Default for unknown strategies
-                    reason = f"Strategy '{strategy_name}' not implemented"
-
-                # --- Decision Logic based on Action ---
-                if action == "BUY":
-                    # Simplified: Buy 1 share if we have enough balance and no position
-                    # In a real system, quantity would be dynamic (e.g., based on balance, risk, fixed amount)
-                    buy_quantity = 1  # Fixed quantity for simplicity
-                    if balance >= current_price * buy_quantity and position == 0:
-                        balance -= current_price * buy_quantity
-                        position += buy_quantity
-                        reason = f"Price={current_price:.2f}, MA={moving_avg:.2f}. BUY executed."
-                    else:
-                        action = "HOLD"
-                        reason = f"Price={current_price:.2f}, MA={moving_avg:.2f}. BUY recommended, but cannot execute (balance={balance:.2f}, position={position})."
-                elif action == "SELL":
-                    # Simplified: Sell 1 share if we have a position
-                    sell_quantity = 1  # Fixed quantity for simplicity
-                    if position >= sell_quantity:
-                        balance += current_price * sell_quantity
-                        position -= sell_quantity
-                        reason = f"Price={current_price:.2f}, MA={moving_avg:.2f}. SELL executed."
-                    else:
-                        action = "HOLD"
-                        reason = f"Price={current_price:.2f}, MA={moving_avg:.2f}. SELL recommended, but cannot execute (no position to sell)."
-                else:  # HOLD
-                    reason = f"Price={current_price:.2f}, MA={moving_avg:.2f}. Holding."
-
-            # Update portfolio value for logging
-            portfolio_value = balance + (position * current_price)
-
-            # Log the action
-            simulation_logs.append({
-                'timestamp': index,  # This is a datetime object
-                'user_id': 'demo_user',  # Or get from input/config
-                'symbol': 'AAPL',  # Or get from input/config
-                'side': action,
-                'quantity': buy_quantity if action == "BUY" else (sell_quantity if action == "SELL" else 0),
-                'strategy': strategy_name,
-                'reason': reason,
-                'balance': balance,
-                'position': position,
-                'portfolio_value': portfolio_value
-            })
-
-            # Reset buy/sell quantities for next iteration
-            buy_quantity = 0
-            sell_quantity = 0
-
-        if not simulation_logs:
+        if df_prices.empty:
             return None  # No simulation ran
 
-        # Convert logs to DataFrame
-        results_df = pd.DataFrame(simulation_logs)
-        results_df['timestamp'] = results_df['timestamp'].dt.strftime(
-            '%Y-%m-%dT%H:%M:%SZ')  # Format timestamp for consistency with example
+        # Resolve thresholds to plain floats once; the kernel only ever sees scalars
+        buy_threshold = float(current_strategy_thresholds.get("buy", 0.02))
+        sell_threshold = float(current_strategy_thresholds.get("sell", 0.03))
+
+        # Moving Average (example) is computed inside the kernel as a running sum
+        window_size = 5  # Example window size for moving average
+        timestamps = df_prices['timestamp']  # Kept as a column; rows are only ever walked in order
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC')  # The 'Z' suffix means UTC, as in strategy.py
+        price = df_prices['price'].to_numpy(dtype=np.float64)
+        moving_avg, raw, actions, balances, positions = kernel(
+            price,
+            window_size,
+            buy_threshold,
+            sell_threshold,
+            float(initial_balance),
+        )
+
+        portfolio_values = balances + positions * price
+
+        results = {
+            'timestamp': timestamps.dt.strftime('%Y-%m-%dT%H:%M:%SZ').to_numpy(),  # Format timestamp for consistency with example
+            'user_id': 'demo_user',  # Or get from input/config
+            'symbol': 'AAPL',  # Or get from input/config
+            'side': np.select([actions == 1, actions == -1], ["BUY", "SELL"], default="HOLD"),
+            'quantity': np.abs(actions).astype(np.int64),
+            'strategy': strategy_name,
+        }
+        if include_reasons:
+            results['reason'] = _build_reasons(price, moving_avg, raw, actions, balances, positions)
+        results['balance'] = balances
+        results['position'] = positions
+        results['portfolio_value'] = portfolio_values
+        results_df = pd.DataFrame(results)
 
         # Optional: Save to CSV here if the app.py doesn't handle it externally
         # results_df.to_csv('simulation_output.csv', index=False)
@@ -172,14 +236,12 @@ def run_simulation(data_source, strategy_name="simple", thresholds=None, initial
         return results_df
 
     except FileNotFoundError:
-        print(f"Error: Data file not found at {data_source}")
+        log.error("Data file not found at %s", data_source)
         return None
     except ValueError as ve:
-        print(f"Data Error: {ve}")
+        log.error("Data Error: %s", ve)
         return None
     except Exception as e:
-        print(f"An unexpected error occurred in simulator: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("An unexpected error occurred in simulator: %s", e)
         return None
 
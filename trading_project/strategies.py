@@ -1,49 +1,102 @@
 # trading_project/strategies.py
-import pandas as pd
-from trading_project.analysis import calculate_sma, calculate_rsi
+import numpy as np
 
-def generate_signals(data: pd.DataFrame, sma_window: int = 20, rsi_window: int = 14, rsi_oversold: int = 30, rsi_overbought: int = 70) -> pd.DataFrame:
+from trading_project.analysis import wilder_step
+from trading_project.utils import njit
+
+try:
+    import numexpr as ne
+except ImportError:  # numexpr is optional; plain NumPy is used without it
+    ne = None
+
+def generate_signals(close: np.ndarray, sma: np.ndarray, rsi: np.ndarray, rsi_oversold: int = 30, rsi_overbought: int = 70) -> np.ndarray:
     """
     Generates buy/sell signals based on SMA crossover and RSI levels.
 
     Args:
-        data (pd.DataFrame): DataFrame with 'Close', 'SMA', 'RSI' columns.
-        sma_window (int): Window size for SMA.
-        rsi_window (int): Window size for RSI.
+        close (np.ndarray): Close prices.
+        sma (np.ndarray): SMA values aligned with close (NaN where undefined).
+        rsi (np.ndarray): RSI values aligned with close (NaN where undefined).
         rsi_oversold (int): RSI threshold for buy signal.
         rsi_overbought (int): RSI threshold for sell signal.
 
     Returns:
-        pd.DataFrame: Original DataFrame with added 'Signal' column (1: Buy, -1: Sell, 0: Hold).
+        np.ndarray: Signal per row (1: Buy, -1: Sell, 0: Hold), e.g. for data['Signal'].
     """
-    if data.empty:
-        return pd.DataFrame()
+    # Comparisons against NaN are False, so rows without valid indicators stay 0
+    # Buy Condition: Price above SMA AND RSI is oversold
+    # Sell Condition: Price below SMA AND RSI is overbought
+    if ne is not None:
+        # numexpr evaluates each condition in one fused pass, without boolean temporaries
+        variables = {'close': close, 'sma': sma, 'rsi': rsi, 'oversold': rsi_oversold, 'overbought': rsi_overbought}
+        buy_condition = ne.evaluate('(close > sma) & (rsi < oversold)', local_dict=variables)
+        sell_condition = ne.evaluate('(close < sma) & (rsi > overbought)', local_dict=variables)
+    else:
+        buy_condition = (close > sma) & (rsi < rsi_oversold)
+        sell_condition = (close < sma) & (rsi > rsi_overbought)
 
-    # Calculate indicators if they don't exist (though ideally they are pre-calculated)
-    if 'SMA' not in data.columns:
-        data['SMA'] = calculate_sma(data, window=sma_window)
-    if 'RSI' not in data.columns:
-        data['RSI'] = calculate_rsi(data, window=rsi_window)
+    # Optional: Remove consecutive signals for a cleaner strategy
+    # For simplicity, we'll leave it as is for now.
 
-    # Initialize signal column
-    data['Signal'] = 0
+    return np.where(buy_condition, 1, np.where(sell_condition, -1, 0))
 
-    # Ensure indicator columns are not all NaN for logic to work
-    if data['SMA'].isnull().all() or data['RSI'].isnull().all():
-        print("Warning: Indicator calculation resulted in all NaNs. Check data or window sizes.")
-        return data # Cannot generate signals without valid indicators
+@njit(cache=True)
+def _compute_signals(close, sma_window, rsi_window, rsi_oversold, rsi_overbought):
+    """
+    Fused single pass over close: running-sum SMA, Wilder RSI and the signal, all with
+    the same semantics as calculate_sma, calculate_rsi and generate_signals.
+    """
+    n = close.shape[0]
+    sma = np.empty(n, dtype=np.float64)
+    rsi = np.empty(n, dtype=np.float64)
+    signal = np.zeros(n, dtype=np.int64)
 
-    # Define Buy Condition: Price crosses above SMA AND RSI is oversold
-    buy_condition = (data['Close'] > data['SMA']) & (data['RSI'] < rsi_oversold) & (data['SMA'].notna()) & (data['RSI'].notna())
+    sma_sum = 0.0
+    sma_nan_count = 0  # NaN closes in the current SMA window
+    avg_gain = 0.0
+    avg_loss = 0.0
 
-    # Define Sell Condition: Price crosses below SMA AND RSI is overbought
-    sell_condition = (data['Close'] < data['SMA']) & (data['RSI'] > rsi_overbought) & (data['SMA'].notna()) & (data['RSI'].notna())
+    for i in range(n):
+        # --- SMA ---
+        if np.isnan(close[i]):
+            sma_nan_count += 1
+        else:
+            sma_sum += close[i]
+        if i >= sma_window:
+            if np.isnan(close[i - sma_window]):
+                sma_nan_count -= 1
+            else:
+                sma_sum -= close[i - sma_window]
+        if i >= sma_window - 1 and sma_nan_count == 0:
+            sma[i] = sma_sum / sma_window
+        else:
+            sma[i] = np.nan
 
-    # Apply signals
-    data.loc[buy_condition, 'Signal'] = 1
-    data.loc[sell_condition, 'Signal'] = -1
+        # --- RSI ---
+        rsi[i] = np.nan
+        if i > 0:
+            avg_gain, avg_loss = wilder_step(i, close[i] - close[i - 1], avg_gain, avg_loss, rsi_window)
+            if i >= rsi_window:
+                if avg_loss == 0.0:
+                    rsi[i] = 100.0
+                else:
+                    rsi[i] = 100.0 * avg_gain / (avg_gain + avg_loss)
 
-    # Optional: Remove consecutive signals for a cleaner strategy
-    # For simplicity, we'll leave it as is for now.
+        # --- Signal (NaN comparisons are False, so undefined rows stay 0) ---
+        if close[i] > sma[i] and rsi[i] < rsi_oversold:
+            signal[i] = 1
+        elif close[i] < sma[i] and rsi[i] > rsi_overbought:
+            signal[i] = -1
+
+    return sma, rsi, signal
+
+def compute_all(close: np.ndarray, sma_window: int = 20, rsi_window: int = 14, rsi_oversold: int = 30, rsi_overbought: int = 70):
+    """
+    Computes SMA, RSI and buy/sell signals in one pass over the Close prices,
+    instead of calculate_sma + calculate_rsi + generate_signals each scanning the data.
 
-    return data
+    Returns:
+        tuple: (sma, rsi, signal) arrays aligned with close.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    return _compute_signals(close, sma_window, rsi_window, float(rsi_oversold), float(rsi_overbought))
@@ -1,16 +1,57 @@
 # auto_trading_project/simulator.py
+import logging
+import numpy as np
 import pandas as pd
 import yaml
 import os
 import io  # For handling file-like objects
+from collections import OrderedDict
+
+from trading_project.analysis import moving_average
+from trading_project.utils import njit
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without libyaml; use the pure-Python loader
+    from yaml import SafeLoader as _YamlLoader
+
+try:
+    import pyarrow
+except ImportError:  # pyarrow is optional; reasons then use Python-backed strings
+    pyarrow = None
+
+log = logging.getLogger(__name__)
 
 # --- Configuration ---
 DEFAULT_INITIAL_BALANCE = 10000.0
 DEFAULT_WINDOW_SIZE = 5  # For moving average calculation
 
+# Action codes returned by the strategy functions; ACTION_LABELS[code] gives the label
+HOLD, BUY, SELL = 0, 1, 2
+ACTION_LABELS = np.array(["HOLD", "BUY", "SELL"])
+
+# Parsed config files keyed by (path, mtime_ns), so an edited file is re-read automatically
+_YAML_CACHE = OrderedDict()
+_YAML_CACHE_SIZE = 32
+
 
 # --- Helper Functions ---
 
+def _load_yaml_cached(file_path: str) -> dict:
+    """Parses a YAML file, reusing the previous result while the file is unchanged."""
+    key = (file_path, os.stat(file_path).st_mtime_ns)
+    if key in _YAML_CACHE:
+        _YAML_CACHE.move_to_end(key)
+        return _YAML_CACHE[key]
+
+    with open(file_path, 'r') as f:
+        config = yaml.load(f, Loader=_YamlLoader)
+    _YAML_CACHE[key] = config
+    if len(_YAML_CACHE) > _YAML_CACHE_SIZE:
+        _YAML_CACHE.popitem(last=False)  # Drop the least recently used file
+    return config
+
+
 def load_strategy_config_for_sim(file_path: str, strategy_name: str, passed_thresholds: dict = None) -> dict:
     """
     Loads strategy thresholds, prioritizing passed thresholds over config file.
@@ -27,13 +68,8 @@ def load_strategy_config_for_sim(file_path: str, strategy_name: str, passed_thre
         "simple": {"buy": 0.02, "sell": 0.03, "window_size": DEFAULT_WINDOW_SIZE}
     }
 
-    if not os.path.exists(file_path):
-        print(f"Warning: Strategy config file not found at '{file_path}'. Using defaults.")
-        return default_strategy_defaults.get(strategy_name, {})
-
     try:
-        with open(file_path, 'r') as f:
-            config = yaml.safe_load(f)
+        config = _load_yaml_cached(file_path)  # A missing file raises FileNotFoundError here
 
         # Get thresholds for the specific strategy, or fall back to general defaults
         strategy_specific_config = config.get(strategy_name, {})
@@ -44,18 +80,64 @@ def load_strategy_config_for_sim(file_path: str, strategy_name: str, passed_thre
 
         return combined_config
 
+    except FileNotFoundError:
+        log.warning("Strategy config file not found at '%s'. Using defaults.", file_path)
+        return default_strategy_defaults.get(strategy_name, {})
     except Exception as e:
-        print(f"Error loading strategy config for simulator: {e}")
+        log.error("Error loading strategy config for simulator: %s", e)
         return default_strategy_defaults.get(strategy_name, {})
 
 
+@njit(cache=True)
+def _simulate(prices, actions, initial_balance):
+    """
+    Balance/position state machine over the action codes (HOLD, BUY, SELL).
+    Buys 1 share only when flat and affordable, sells only when holding.
+    Runs as plain Python when numba is not installed.
+
+    Returns:
+        (balances, positions, portfolio_values) arrays, one entry per price.
+    """
+    n = prices.shape[0]
+    balances = np.empty(n, dtype=np.float64)
+    positions = np.empty(n, dtype=np.int64)
+    portfolio_values = np.empty(n, dtype=np.float64)
+
+    balance = initial_balance
+    position = 0  # Number of shares held
+    for i in range(n):
+        if actions[i] == BUY and balance >= prices[i] and position == 0:
+            balance -= prices[i]
+            position += 1
+        elif actions[i] == SELL and position > 0:
+            balance += prices[i]
+            position -= 1
+        balances[i] = balance
+        positions[i] = position
+        portfolio_values[i] = balance + position * prices[i]
+
+    return balances, positions, portfolio_values
+
+
+def _signal_reason(action: int, signal: int, price: float, moving_avg: float, balance: float, position: int) -> str:
+    """Log reason for a row with a BUY/SELL signal, executed (action) or not."""
+    if action == BUY:
+        return f"BUY Executed: Price={price:.2f}, MA={moving_avg:.2f}"
+    if action == SELL:
+        return f"SELL Executed: Price={price:.2f}, MA={moving_avg:.2f}"
+    if signal == BUY:
+        return f"BUY Recommended, but HOLD: Price={price:.2f}, MA={moving_avg:.2f} (Balance={balance:.2f}, Pos={position})"
+    return f"SELL Recommended, but HOLD: Price={price:.2f}, MA={moving_avg:.2f} (Pos={position})"
+
+
 def run_simulation(data_source, strategy_name="simple", strategy_params=None, initial_balance=DEFAULT_INITIAL_BALANCE):
     """
     Runs the simulation engine.
 
     Args:
         data_source: Path to CSV file or a file-like object (StringIO).
-        strategy_name: Name of the strategy to use (e.g., "simple").
+        strategy_name: Name of the strategy to use (a key of STRATEGY_REGISTRY, e.g. "simple").
+                       Unknown names simulate as HOLD throughout.
         strategy_params: A dictionary of parameters for the selected strategy.
                          Example: {"buy": 0.02, "sell": 0.03, "window_size": 5}
                          These are prioritized over the config file.
@@ -64,39 +146,41 @@ def run_simulation(data_source, strategy_name="simple", strategy_params=None, in
     Returns:
         A pandas DataFrame containing simulation results, or None if an error occurs.
     """
-    print(f"Starting simulation with strategy: '{strategy_name}'")
+    log.debug("Starting simulation with strategy: '%s'", strategy_name)
 
     # --- Data Loading ---
     try:
+        # Only the needed columns, with the types and the timestamp index set up while parsing.
+        # A missing 'timestamp' or 'price' column raises a ValueError from read_csv.
+        csv_options = dict(usecols=['timestamp', 'price'], dtype={'price': np.float64},
+                           parse_dates=['timestamp'], index_col='timestamp')
         if isinstance(data_source, str):  # It's a file path
-            df_prices = pd.read_csv(data_source)
-            print(f"Loading data from file path: {data_source}")
+            df_prices = pd.read_csv(data_source, **csv_options)
+            log.debug("Loading data from file path: %s", data_source)
         elif hasattr(data_source, 'read'):  # It's a file-like object (e.g., StringIO)
-            df_prices = pd.read_csv(data_source)
-            print("Loading data from file-like object.")
+            df_prices = pd.read_csv(data_source, **csv_options)
+            log.debug("Loading data from file-like object.")
         else:
             raise ValueError("Invalid data_source provided. Must be a file path or file-like object.")
 
-        # Ensure required columns exist and are in correct format
-        required_cols = ['timestamp', 'price']
-        if not all(col in df_prices.columns for col in required_cols):
-            missing = [col for col in required_cols if col not in df_prices.columns]
-            raise ValueError(f"CSV must contain '{required_cols}'. Missing: {missing}")
-
-        df_prices['timestamp'] = pd.to_datetime(df_prices['timestamp'])
-        df_prices.set_index('timestamp', inplace=True)
-        df_prices.sort_index(inplace=True)  # Ensure chronological order
+        # read_csv leaves timestamps it could not parse (e.g. mixed formats) as strings
+        if not isinstance(df_prices.index, pd.DatetimeIndex):
+            df_prices.index = pd.to_datetime(df_prices.index)
+        if not df_prices.index.is_monotonic_increasing:
+            df_prices.sort_index(inplace=True)  # Ensure chronological order
 
     except FileNotFoundError:
-        print(f"Error: Data file not found at {data_source}")
+        log.error("Data file not found at %s", data_source)
         return None
     except ValueError as ve:
-        print(f"Data Error: {ve}")
+        log.error("Data Error: %s", ve)
         return None
     except Exception as e:
-        print(f"Error loading or processing data: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error loading or processing data: %s", e)
+        return None
+
+    if df_prices.empty:
+        log.warning("No simulation logs were generated.")
         return None
 
     # --- Strategy Configuration Loading ---
@@ -110,132 +194,101 @@ def run_simulation(data_source, strategy_name="simple", strategy_params=None, in
     )
 
     if not current_strategy_thresholds:
-        print(f"Error: Could not determine strategy parameters for '{strategy_name}'.")
+        log.error("Could not determine strategy parameters for '%s'.", strategy_name)
         return None
 
-    print(f"Using strategy parameters for '{strategy_name}': {current_strategy_thresholds}")
+    log.debug("Using strategy parameters for '%s': %s", strategy_name, current_strategy_thresholds)
 
     # --- Simulation Core Logic ---
-    balance = initial_balance
-    position = 0  # Number of shares held
-    simulation_logs = []
-
     # --- Strategy-Specific Calculations ---
     # Example: Moving Average calculation for 'simple' strategy
     window_size = current_strategy_thresholds.get("window_size", DEFAULT_WINDOW_SIZE)
-    if 'price' in df_prices.columns:
-        df_prices['moving_avg'] = df_prices['price'].rolling(window=window_size).mean()
+    price = df_prices['price'].to_numpy(dtype=np.float64)
+    # Running-sum SMA on the raw array; windows containing NaN give NaN, as with rolling().mean()
+    moving_avg = moving_average(price, window_size)
+
+    # --- Strategy Signals (vectorized over the whole series) ---
+    strategy_fn = STRATEGY_REGISTRY.get(strategy_name)  # Resolved once, not per row
+    if strategy_fn is not None:
+        signals = strategy_fn(price, moving_avg, current_strategy_thresholds)
     else:
-        print("Warning: 'price' column not found, cannot calculate moving average.")
-        return None  # Cannot proceed without price
-
-    # --- Iteration through Data ---
-    for index, row in df_prices.iterrows():
-        current_price = row['price']
-        moving_avg = row.get('moving_avg')  # Use .get() in case 'moving_avg' column wasn't created or has NaN
-
-        action = "HOLD"
-        reason = "Initialization"
-        buy_quantity = 0
-        sell_quantity = 0
-
-        # Check if moving_avg is valid for strategies that need it
-        if pd.isna(moving_avg) and strategy_name == "simple":
-            reason = f"Insufficient data for moving average (window={window_size})"
-        else:
-            # --- Strategy Execution ---
-            # This part needs to dynamically call the correct strategy function.
-            # For now, we'll hardcode it for 'simple'. In a more advanced system,
-            # you'd map strategy names to functions.
-            if strategy_name == "simple":
-                # Ensure the strategy function can handle potential missing params if not all are provided
-                action = simple_strategy(
-                    current_price=current_price,
-                    moving_avg=moving_avg,
-                    thresholds={
-                        "buy": current_strategy_thresholds.get("buy"),
-                        "sell": current_strategy_thresholds.get("sell")
-                    }
-                )
-            # elif strategy_name == "rsi_strategy":
-            #     rsi_value = row.get('rsi') # Assuming RSI is calculated and available
-            #     action = rsi_strategy(current_price, rsi_value, current_strategy_thresholds)
-            else:
-                reason = f"Strategy '{strategy_name}' not implemented in simulator."
-                action = "HOLD"
-
-        # --- Decision Logic & Trade Execution Simulation ---
-        if action == "BUY":
-            # Simplified: Buy 1 share if we have enough balance and no position
-            # In a real system, quantity would be dynamic
-            quantity_to_buy_sell = 1  # Default fixed quantity
-            cost = current_price * quantity_to_buy_buy
-
-            if balance >= cost and position == 0:  # Check balance and no existing position
-                balance -= cost
-                position += quantity_to_buy_sell
-                reason = f"BUY Executed: Price={current_price:.2f}, MA={moving_avg:.2f}"
-            else:
-                action = "HOLD"  # Override to HOLD if conditions not met
-                reason = f"BUY Recommended, but HOLD: Price={current_price:.2f}, MA={moving_avg:.2f} (Balance={balance:.2f}, Pos={position})"
-
-        elif action == "SELL":
-            # Simplified: Sell 1 share if we have a position
-            quantity_to_buy_sell = 1  # Default fixed quantity
-            revenue = current_price * quantity_to_buy_sell
-
-            if position >= quantity_to_buy_sell:  # Check if we have enough to sell
-                balance += revenue
-                position -= quantity_to_buy_sell
-                reason = f"SELL Executed: Price={current_price:.2f}, MA={moving_avg:.2f}"
-            else:
-                action = "HOLD"  # Override to HOLD if conditions not met
-                reason = f"SELL Recommended, but HOLD: Price={current_price:.2f}, MA={moving_avg:.2f} (Pos={position})"
-
-        # Ensure if action was HOLD, quantity is 0
-        if action == "HOLD":
-            buy_quantity = 0
-            sell_quantity = 0
-            # If reason wasn't set by buy/sell recommendation failure, set a generic HOLD reason
-            if "Recommended" not in reason and "Executed" not in reason and "Insufficient" not in reason and "not implemented" not in reason:
-                reason = f"HOLD: Price={current_price:.2f}, MA={moving_avg:.2f}"
-
-        # --- Update Portfolio Value & Log ---
-        portfolio_value = balance + (position * current_price)
-
-        # Log details for this step
-        simulation_logs.append({
-            'timestamp': index,  # This is a datetime object, will format later
-            'user_id': 'demo_user',  # Placeholder, could be an input
-            'symbol': 'AAPL',  # Placeholder, could be an input
-            'side': action,
-            'quantity': quantity_to_buy_sell if action in ["BUY", "SELL"] else 0,
-            'strategy': strategy_name,
-            'reason': reason,
-            'balance': balance,
-            'position': position,
-            'portfolio_value': portfolio_value
-        })
-
-        # Reset quantities for next iteration if they were used
-        quantity_to_buy_sell = 0
-
-    if not simulation_logs:
-        print("No simulation logs were generated.")
-        return None
+        signals = np.zeros(len(price), dtype=np.int8)
+    # Rows without a moving average (warm-up, or NaN prices in the window) never trade
+    missing_ma = np.isnan(moving_avg)
+    signals[missing_ma] = 0
+
+    # --- Decision Logic & Trade Execution Simulation ---
+    balances, positions, portfolio_values = _simulate(price, signals, float(initial_balance))
+    # A trade was executed wherever the position changed
+    trades = np.diff(positions, prepend=0)
+    actions = np.select([trades > 0, trades < 0], [BUY, SELL], default=HOLD).astype(np.int8)
+
+    # --- Log Reasons ---
+    # HOLD is the bulk of the rows, so its reason is built column-wise; only rows with a
+    # BUY/SELL signal get a reason formatted one by one
+    if strategy_fn is None:
+        reasons = np.full(len(price), f"Strategy '{strategy_name}' not implemented in simulator.", dtype=object)
+    else:
+        reasons = np.full(len(price), f"Insufficient data for moving average (window={window_size})", dtype=object)
+        has_ma = ~missing_ma
+        reasons[has_ma] = np.char.add(np.char.add("HOLD: Price=", np.char.mod('%.2f', price[has_ma])),
+                                      np.char.add(", MA=", np.char.mod('%.2f', moving_avg[has_ma])))
+        signal_rows = np.flatnonzero(signals)
+        reasons[signal_rows] = [
+            _signal_reason(actions[i], signals[i], price[i], moving_avg[i], balances[i], positions[i])
+            for i in signal_rows
+        ]
+
+    # Build the log column by column; scalar entries are broadcast by pandas.
+    # side/strategy have a tiny vocabulary, so they are stored as categorical codes.
+    results_df = pd.DataFrame({
+        # Format timestamp for consistency with your example output ('...T...Z'), in one C-level pass
+        'timestamp': np.datetime_as_string(df_prices.index.values.astype('datetime64[s]'), unit='s', timezone='UTC'),
+        'user_id': 'demo_user',  # Placeholder, could be an input
+        'symbol': 'AAPL',  # Placeholder, could be an input
+        'side': pd.Categorical.from_codes(actions, categories=ACTION_LABELS),  # Codes map straight to labels
+        'quantity': (actions != HOLD).astype(np.int64),  # Fixed quantity of 1 share per trade
+        'strategy': pd.Categorical.from_codes(np.zeros(len(actions), dtype=np.int8), categories=[strategy_name]),
+        'reason': pd.array(reasons, dtype="string[pyarrow]" if pyarrow is not None else "string"),
+        'balance': balances,
+        'position': positions,
+        'portfolio_value': portfolio_values,
+    })
+
+    log.debug("Simulation finished. Total logs: %d", len(results_df))
+    return results_df
 
-    # Convert logs to DataFrame
-    results_df = pd.DataFrame(simulation_logs)
+# auto_trading_project/strategy.py
 
-    # Format timestamp for consistency with your example output
-    results_df['timestamp'] = results_df['timestamp'].dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+def simple_strategy_vec(prices: np.ndarray, moving_avgs: np.ndarray, thresholds: dict) -> np.ndarray:
+    """
+    A simple moving average based strategy, evaluated for a whole series at once.
 
-    print(f"Simulation finished. Total logs: {len(results_df)}")
-    return results_df
+    Args:
+        prices: Array of trading prices.
+        moving_avgs: Moving averages aligned with prices (NaN where undefined).
+        thresholds: Dictionary containing 'buy' and 'sell' thresholds.
+                      Example: {"buy": 0.02, "sell": 0.03}
+
+    Returns:
+        int8 array of action codes (HOLD, BUY, SELL).
+        Rows with a NaN moving average are HOLD.
+    """
+    buy_threshold = thresholds.get("buy", 0.02) # Default if not provided
+    sell_threshold = thresholds.get("sell", 0.03) # Default if not provided
+
+    prices = np.asarray(prices, dtype=np.float64)
+    moving_avgs = np.asarray(moving_avgs, dtype=np.float64)
+    # Both bands are computed once per series, into one shared buffer
+    band = np.empty_like(moving_avgs)
+    np.multiply(moving_avgs, 1.0 - buy_threshold, out=band)  # Lower band
+    buy = prices < band
+    np.multiply(moving_avgs, 1.0 + sell_threshold, out=band)  # Upper band
+    sell = prices > band
+    return np.where(buy, BUY, np.where(sell, SELL, HOLD)).astype(np.int8)
 
-# auto_trading_project/strategy.py
 
-def simple_strategy(current_price: float, moving_avg: float, thresholds: dict) -> str:
+def simple_strategy(current_price: float, moving_avg: float, thresholds: dict) -> int:
     """
     A simple moving average based strategy.
 
@@ -246,18 +299,29 @@ def simple_strategy(current_price: float, moving_avg: float, thresholds: dict) -
                       Example: {"buy": 0.02, "sell": 0.03}
 
     Returns:
-        "BUY", "SELL", or "HOLD"
+        Action code BUY, SELL, or HOLD (an int8 array of codes when given arrays).
+        ACTION_LABELS[code] gives "BUY", "SELL", or "HOLD".
     """
+    if not (np.isscalar(current_price) and np.isscalar(moving_avg)):
+        return simple_strategy_vec(current_price, moving_avg, thresholds)
+
     buy_threshold = thresholds.get("buy", 0.02) # Default if not provided
     sell_threshold = thresholds.get("sell", 0.03) # Default if not provided
 
     if current_price < moving_avg * (1 - buy_threshold):
-        return "BUY"
+        return BUY
     elif current_price > moving_avg * (1 + sell_threshold):
-        return "SELL"
+        return SELL
     else:
-        return "HOLD"
+        return HOLD
+
 
 # You can add more strategy functions here in the future, e.g.:
 # def rsi_strategy(current_price, rsi_value, thresholds): ...
 # def bollinger_bands_strategy(current_price, upper_band, lower_band, thresholds): ...
+
+# Vectorized strategies by name, as used by run_simulation: each takes
+# (prices, moving_avgs, thresholds) and returns an int8 array of action codes.
+STRATEGY_REGISTRY = {
+    "simple": simple_strategy_vec,
+}
@@ -1,6 +1,17 @@
 # trading_project/utils.py
 import pandas as pd
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; kernels then run as plain Python
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    prange = range  # Parallel loops run serially
+
 def format_date_for_display(date_obj):
     """Formats a date object into a human-readable string."""
     if isinstance(date_obj, pd.Timestamp):